@@ -1,11 +1,44 @@
 # Copyright (c) 2009-2011 by Minor Gordon, Bjoern Kolbeck, Zuse Institute Berlin
 # Licensed under the BSD License, see LICENSE file for details.
 
+from contextlib import closing
 from datetime import datetime
-from time import sleep
-import sys, os, subprocess, signal
+from time import sleep, time
+from urllib2 import urlopen
+import sys, os, errno, subprocess, signal, shutil, socket
+
+# Time in seconds a freshly started server has to open its RPC port.
+_START_TIMEOUT = 30
+
+# The java binary which runs the servers, see _get_java_bin().
+_java_bin = None
+
+# Returns the java binary in JAVA_HOME. It is resolved on the first start
+# of a server, so importing this module does not require JAVA_HOME.
+def _get_java_bin():
+    global _java_bin
+    if _java_bin is None:
+        _java_bin = os.path.join(os.environ["JAVA_HOME"], "bin", "java")
+    return _java_bin
+
+# Writes the buffered lines to stdout with a single write.
+def _write_log_lines(log_lines):
+    if log_lines:
+        sys.stdout.write("\n".join(log_lines) + "\n")
+
+# Creates path and its parent directories unless they already exist.
+def _mkdir_p(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
 
 class Server:
+    # Maps xtreemfs_dir to the classpath of the servers, see _build_classpath.
+    _classpath_cache = dict()
+
     def __init__(self,
                  start_stop_retries,
                  config_file_path,
@@ -28,6 +61,7 @@ class Server:
         self._config['uuid'] = uuid
         self._config['ssl.enabled'] = 'false'
         self._config['storage_threads'] = storage_threads
+        self._update_cached_config()
 
     def configure(self):
         pass
@@ -42,46 +76,50 @@ class Server:
                    pkcs12_passphrase,
                    trusted_certs_jks_file_path,
                    trusted_certs_jks_passphrase):
-        self._config['ssl.enabled'] = 'true'
-        if use_gridssl:
-            self._config['ssl.grid_ssl'] = 'true'
-        else:
-            self._config['ssl.grid_ssl'] = 'false'
-
-        self._config['ssl.service_creds'] = pkcs12_file_path
-        self._config['ssl.service_creds.pw'] = pkcs12_passphrase
-        self._config['ssl.service_creds.container'] = 'PKCS12'
-        self._config['ssl.trusted_certs'] = trusted_certs_jks_file_path
-        self._config['ssl.trusted_certs.pw'] = trusted_certs_jks_passphrase
-        self._config['ssl.trusted_certs.container'] = 'JKS'
+        self._config.update({
+            'ssl.enabled': 'true',
+            'ssl.grid_ssl': 'true' if use_gridssl else 'false',
+            'ssl.service_creds': pkcs12_file_path,
+            'ssl.service_creds.pw': pkcs12_passphrase,
+            'ssl.service_creds.container': 'PKCS12',
+            'ssl.trusted_certs': trusted_certs_jks_file_path,
+            'ssl.trusted_certs.pw': trusted_certs_jks_passphrase,
+            'ssl.trusted_certs.container': 'JKS'})
+        # The scheme of the service URL changes.
+        self._service_url = None
 
     # set configuration parameters required for SNMP support
     def enable_snmp(self,
                     snmp_port,
                     snmp_address,
                     snmp_aclfile):
-        self._config['snmp.enabled'] = 'true'
-        self._config['snmp.port'] = snmp_port
-        self._config['snmp.address'] = snmp_address
-        self._config['snmp.aclfile'] = snmp_aclfile
+        self._config.update({
+            'snmp.enabled': 'true',
+            'snmp.port': snmp_port,
+            'snmp.address': snmp_address,
+            'snmp.aclfile': snmp_aclfile})
         
          
     # Imports the configuration from the config file.
     def read_config_file(self):
         self._config = dict()
-        for line in open(self._config_file_path).readlines():
-            line_parts = line.split( "=", 1 )
-            if len( line_parts ) == 2:
-                self._config[line_parts[0].strip()] = line_parts[1].strip()
+        with open(self._config_file_path) as f:
+            for line in f:
+                # Skip comments and blank lines before tokenizing.
+                if line[0] in "#\r\n":
+                    continue
+                k, sep, v = line.partition("=")
+                if sep:
+                    self._config[k.strip()] = v.strip()
+
+        self._update_cached_config()
 
     # Writes the current configuration to a config file
     def write_config_file(self):
-        text = "# autogenerated by test_server.py at "+str(datetime.now())+"\n"
-        for k in sorted(self._config.keys()):
-            text += str(k) +  "=" + str(self._config[k]) + "\n"
-        f = open(self._config_file_path,'w')
-        f.write(text)
-        f.close()
+        lines = ["# autogenerated by test_server.py at %s" % datetime.now()]
+        lines.extend("%s=%s" % item for item in sorted(self._config.items()))
+        with open(self._config_file_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
 
     def get_config_file_path(self):
         return self._config_file_path
@@ -90,219 +128,377 @@ class Server:
         return self._config[key]
 
     def _get_pid_file_path(self):
-        return os.path.join(self._run_dir_path, self.get_uuid() + ".pid")
+        return self._pid_file_path
+
+    # Caches the ports, the UUID and the pid file path so the getters do not
+    # have to derive them from _config on every call. Must be called whenever
+    # _config is replaced or one of these keys changes.
+    def _update_cached_config(self):
+        self._rpc_port = int(self._config.get("listen.port", 0))
+        self._http_port = int(self._config.get("http_port", 0))
+        self._uuid = self._config.get("uuid", "")
+        self._pid_file_path = os.path.join(self._run_dir_path, self._uuid + ".pid")
+        self._service_url = None
 
     def get_http_port(self):
-        return int(self._config["http_port"])
+        return self._http_port
 
     def get_rpc_port(self):
-        return int(self._config["listen.port"])
+        return self._rpc_port
 
     def get_uuid(self):
-        return self._config["uuid"]
+        return self._uuid
 
-    def getServiceUrl(self):
-        url = "pbrpc://"
-        if (self._config['ssl.enabled'] == 'true'):
-            if (self._config['ssl.grid_ssl'] == 'true'):
-                url = "pbrpcg://"
+    def _compute_service_url(self):
+        scheme = "pbrpc"
+        if (self._config.get('ssl.enabled') == 'true'):
+            if (self._config.get('ssl.grid_ssl') == 'true'):
+                scheme = "pbrpcg"
             else:
-                url = "pbrpcs://"
-        url += "localhost:" + str(self._config["listen.port"]) + "/"
-        return url
+                scheme = "pbrpcs"
+        return "%s://localhost:%d/" % (scheme, self._rpc_port)
+
+    # The URL is computed on first use, because the configuration may be
+    # incomplete before (e.g. right after read_config_file()).
+    def getServiceUrl(self):
+        if self._service_url is None:
+            self._service_url = self._compute_service_url()
+        return self._service_url
 
     def is_running(self):
-        pid_file_path = self._get_pid_file_path()
-        if os.path.exists(pid_file_path):
-            pid = open(pid_file_path).read().strip()
+        try:
+            with open(self._get_pid_file_path()) as f:
+                pid = f.read().strip()
+        except (IOError, OSError):
+            return False
 
-            try:
-                pid = int(pid)
-            except ValueError:
-                return False
+        try:
+            pid = int(pid)
+        except ValueError:
+            return False
 
-            #print "xtestenv: checking if", self.__class__.__name__, "server is running with pid", pid
+        #print "xtestenv: checking if", self.__class__.__name__, "server is running with pid", pid
 
-            try:
-                pid, exitvalue = os.waitpid(int(pid), os.WNOHANG)
-                if pid != 0 and exitvalue != 0:
-                    return False
-                else:
-                    return True
-            except OSError:
+        try:
+            pid, exitvalue = os.waitpid(int(pid), os.WNOHANG)
+            if pid != 0 and exitvalue != 0:
                 return False
-        else:
+            else:
+                return True
+        except OSError:
             return False
 
     def save_status_page(self, to_file_path):
         http_port = self.get_http_port()
-        os.system("wget -O %(to_file_path)s http://localhost:%(http_port)u" % locals())
-
-    def start(self,
-              log_file_path=None):
+        with closing(urlopen("http://localhost:%u" % http_port)) as r:
+            with open(to_file_path, "wb") as f:
+                shutil.copyfileobj(r, f, 65536)
+
+    # Constructs the -cp classpath. It only depends on xtreemfs_dir and is
+    # therefore computed once for all servers. The fallback to the installed
+    # jar is not cached, so a jar built later is still picked up.
+    @classmethod
+    def _build_classpath(cls, xtreemfs_dir):
+        try:
+            return cls._classpath_cache[xtreemfs_dir]
+        except KeyError:
+            pass
+
+        xtreemfs_dir_abs = os.path.abspath(xtreemfs_dir)
+        xtreemfs_jar = os.path.normpath(os.path.join(xtreemfs_dir_abs, "java", "xtreemfs-servers", "target", "xtreemfs.jar"))
+        if not os.path.exists(xtreemfs_jar):
+            return os.path.join("/usr/share/java/xtreemfs.jar")
+        cls._classpath_cache[xtreemfs_dir] = xtreemfs_jar
+        return xtreemfs_jar
+
+    # Returns True if something accepts connections on the RPC port.
+    def _is_listening(self):
+        try:
+            socket.create_connection(("localhost", self.get_rpc_port()), 0.1).close()
+            return True
+        except socket.error:
+            return False
 
-        if sys.platform == "win32" or not self.is_running():
-            try: os.mkdir(self._run_dir_path)
-            except: pass
-            pid_file_path = self._get_pid_file_path()
+    # Spawns the server process and records its pid in the pid file.
+    def _launch(self, log_file_path):
+        # Otherwise _wait_until_listening() would mistake the other process
+        # for the server.
+        if self._is_listening():
+            raise RuntimeError, self.get_uuid() + " cannot start, port " + str(self.get_rpc_port()) + " is already in use"
 
-            java_args = [os.path.join(os.environ["JAVA_HOME"], "bin", "java")]
+        _mkdir_p(self._run_dir_path)
+        pid_file_path = self._get_pid_file_path()
 
-            # Enable assertions.
-            java_args.append("-ea")
+        java_args = [_get_java_bin()]
 
-            # Construct the -cp classpath
-            xtreemfs_jar = os.path.abspath(os.path.join(self._xtreemfs_dir, "java", "xtreemfs-servers", "target", "xtreemfs.jar"))
-            if os.path.exists(xtreemfs_jar):
-                classpath = xtreemfs_jar
-            else:
-                classpath = os.path.join("/usr/share/java/xtreemfs.jar")
-            java_args.extend(("-cp", classpath))
+        # Enable assertions.
+        java_args.append("-ea")
 
-            # Name of the class to start
-            java_args.append("org.xtreemfs." + self.__class__.__name__.lower() + "." + self.__class__.__name__.upper())
+        java_args.extend(("-cp", self._build_classpath(self._xtreemfs_dir)))
 
-            # .config file
-            java_args.append(self.get_config_file_path())
+        # Name of the class to start
+        java_args.append(self._MAIN_CLASS)
 
-            # Don't .join java_args, since Popen wants a sequence when shell=False
+        # .config file
+        java_args.append(self.get_config_file_path())
 
-            if log_file_path is None:
-                stderr = sys.stderr
-                stdout = sys.stdout
-            else:
-                # Redirect stderr and stdout to a log file
-                stderr = stdout = open(log_file_path, "a")
+        # Don't .join java_args, since Popen wants a sequence when shell=False
 
-            #print "xctl: starting", self.__class__.__name__, "server with UUID", self.get_uuid(), "on port", self.get_rpc_port(), "with", " ".join(java_args)
+        if log_file_path is None:
+            stderr = sys.stderr
+            stdout = sys.stdout
+        else:
+            # Redirect stderr and stdout to a log file
+            stderr = stdout = open(log_file_path, "a")
+
+        #print "xctl: starting", self.__class__.__name__, "server with UUID", self.get_uuid(), "on port", self.get_rpc_port(), "with", " ".join(java_args)
+
+        # The server runs in its own session. close_fds=False (the default)
+        # is passed explicitly: closing every descriptor up to SC_OPEN_MAX in
+        # the child is expensive with a high ulimit, and the descriptors
+        # java inherits are harmless.
+        p = subprocess.Popen(java_args, stdout=stdout, stderr=stderr, # No shell=True: we only want one process (java), not two (/bin/sh and java)
+                             close_fds=False, preexec_fn=getattr(os, "setsid", None))
+        pidfile = open(pid_file_path, "w+")
+        pidfile.write(str(p.pid))
+        pidfile.close()
+
+        print "xtestenv: started", self.__class__.__name__, "server with UUID", self.get_uuid(), "on port", self.get_rpc_port(), "with pid", p.pid
+
+    # Waits until the server accepts connections on its RPC port. Raises
+    # RuntimeError if the server exits or does not open its port before
+    # deadline; the server is not left running in either case.
+    def _wait_until_listening(self, deadline):
+        while time() < deadline:
+            listening = self._is_listening()
+
+            # Another process may have taken the port in the meantime, so the
+            # server also has to be alive.
+            if not self.is_running():
+                # is_running() has reaped the process, so stop() must not
+                # signal its pid any more.
+                os.unlink(self._get_pid_file_path())
+                raise RuntimeError, self.get_uuid() + " failed to start"
+            if listening:
+                return
 
-            p = subprocess.Popen(java_args, stdout=stdout, stderr=stderr) # No shell=True: we only want one process (java), not two (/bin/sh and java)
-            if p.returncode is not None:
-                raise RuntimeError(self.get_uuid() + " failed to start: " + str(p.returncode))
-            pidfile = open(pid_file_path, "w+")
-            pidfile.write(str(p.pid))
-            pidfile.close()
+            sleep(0.05)
 
-            print "xtestenv: started", self.__class__.__name__, "server with UUID", self.get_uuid(), "on port", self.get_rpc_port(), "with pid", p.pid
+        self.stop()
+        raise RuntimeError, self.get_uuid() + " did not open port " + str(self.get_rpc_port()) + " in time"
 
-            sleep(1.0)
+    def start(self,
+              log_file_path=None):
 
-            if not self.is_running():
-                raise RuntimeError, self.get_uuid() + " failed to start"
+        if sys.platform == "win32" or not self.is_running():
+            self._launch(log_file_path)
+            self._wait_until_listening(time() + _START_TIMEOUT)
         else:
             print "xtestenv:", self.__class__.__name__, "server with UUID", self.get_uuid(), "is already running"
 
+    # Starts several servers at once. All servers are spawned first and then
+    # waited for together, so the startup time is that of the slowest server
+    # instead of the sum over all servers.
+    # log_file_paths holds the log file of the server at the same position.
+    # If one server fails to start, all started servers are stopped again.
+    @classmethod
+    def start_all(cls, servers, log_file_paths):
+        started = []
+        try:
+            for server, log_file_path in zip(servers, log_file_paths):
+                if sys.platform != "win32" and server.is_running():
+                    print "xtestenv:", server.__class__.__name__, "server with UUID", server.get_uuid(), "is already running"
+                    continue
+                server._launch(log_file_path)
+                started.append(server)
+
+            deadline = time() + _START_TIMEOUT
+            for server in started:
+                server._wait_until_listening(deadline)
+        except:
+            cls.stop_all(started)
+            raise
+
+    # Returns the pid stored in the pid file. Raises IOError or OSError if
+    # there is no pid file.
+    def _read_pid(self):
+        with open(self._get_pid_file_path()) as f:
+            return int(f.read().strip())
+
     def stop(self):
         pid_file_path = self._get_pid_file_path()
-        if os.path.exists(pid_file_path):
-            pid = int(open(pid_file_path).read().strip())
-
-            if sys.platform.startswith("win"):
-                subprocess.call("TASKKILL /PID %(pid)u /F /T" % locals())
-                killed = True
-            else:
-                killed = False
-                for signo in (signal.SIGTERM, signal.SIGKILL):
-                    for try_i in xrange(self._start_stop_retries):
-                        print "xtestenv: stopping", self.__class__.__name__, "server with pid", pid, "with signal", str(signo) + ", try", try_i
-
-                        try: os.kill(pid, signo)
-                        except: pass
-                        
-                        sleep(0.5)
-
-                        try:
-                            if os.waitpid(pid, os.WNOHANG)[0] != 0:
-                                killed = True
-                                break
-                        except OSError:
+        try:
+            pid = self._read_pid()
+        except (IOError, OSError):
+            print "xtestenv: no pid file for", self.__class__.__name__, "server"
+            return
+
+        # Progress messages are collected and written at once, so that
+        # stdout is not flushed while waiting for the server to exit.
+        log_lines = []
+        if sys.platform.startswith("win"):
+            subprocess.call("TASKKILL /PID %(pid)u /F /T" % locals())
+            killed = True
+        else:
+            killed = False
+            for signo in (signal.SIGTERM, signal.SIGKILL):
+                for try_i in xrange(self._start_stop_retries):
+                    log_lines.append("xtestenv: stopping %s server with pid %d with signal %d, try %d" % (self.__class__.__name__, pid, signo, try_i))
+
+                    try: os.kill(pid, signo)
+                    except: pass
+                    
+                    sleep(0.5)
+
+                    try:
+                        if os.waitpid(pid, os.WNOHANG)[0] != 0:
                             killed = True
                             break
-                        except:
-                            if DEBUG_ME:
-                                traceback.print_exc()
-
-                    if killed:
+                    except OSError:
+                        killed = True
                         break
-
-            if killed:
-                os.unlink(pid_file_path)
-
-        else:
-            print "xtestenv: no pid file for", self.__class__.__name__, "server"
+                    except:
+                        if DEBUG_ME:
+                            traceback.print_exc()
+
+                if killed:
+                    break
+
+        if killed:
+            os.unlink(pid_file_path)
+
+        _write_log_lines(log_lines)
+
+    # Stops several servers at once. Each signal is sent to all servers and
+    # they are then checked together, so stopping takes at most
+    # start_stop_retries tries per signal regardless of the number of
+    # servers.
+    @classmethod
+    def stop_all(cls, servers):
+        if sys.platform.startswith("win"):
+            for server in servers:
+                server.stop()
+            return
+
+        # Maps the pid of every server which is still running to the server.
+        running = dict()
+        for server in servers:
+            try:
+                running[server._read_pid()] = server
+            except (IOError, OSError):
+                print "xtestenv: no pid file for", server.__class__.__name__, "server"
+
+        retries = max([server._start_stop_retries for server in running.values()] or [0])
+        for signo in (signal.SIGTERM, signal.SIGKILL):
+            for try_i in xrange(retries):
+                if not running:
+                    return
+
+                log_lines = []
+                for pid, server in running.items():
+                    log_lines.append("xtestenv: stopping %s server with pid %d with signal %d, try %d" % (server.__class__.__name__, pid, signo, try_i))
+                    try: os.kill(pid, signo)
+                    except OSError: pass
+                _write_log_lines(log_lines)
+
+                sleep(0.5)
+
+                for pid, server in running.items():
+                    try:
+                        if os.waitpid(pid, os.WNOHANG)[0] == 0:
+                            continue
+                    except OSError:
+                        pass
+                    del running[pid]
+                    os.unlink(server._get_pid_file_path())
 
 
 class DIR(Server):
+    _MAIN_CLASS = "org.xtreemfs.dir.DIR"
+
+    # Configuration values which are the same for all DIR instances.
+    _STATIC_DEFAULTS = {
+        'babudb.sync': 'FSYNC',
+        'babudb.worker.maxQueueLength': '250',
+        'babudb.worker.numThreads': '0',
+        'babudb.maxLogfileSize': '16777216',
+        'babudb.checkInterval': '300',
+        'babudb.pseudoSyncWait': '200',
+        'authentication_provider': 'org.xtreemfs.common.auth.NullAuthProvider'}
+
     def configure(self):
-        try: os.mkdir(self._data_dir)
-        except: pass
-
-        self._config['babudb.debug.level'] = self._config['debug.level']
-        self._config['babudb.logDir'] = self._data_dir
-        self._config['babudb.baseDir'] = self._data_dir
-        self._config['babudb.sync'] = 'FSYNC'
-        self._config['babudb.worker.maxQueueLength'] = '250'
-        self._config['babudb.worker.numThreads'] = '0'
-        self._config['babudb.maxLogfileSize'] = '16777216'
-        self._config['babudb.checkInterval'] = '300'
-        self._config['babudb.pseudoSyncWait'] = '200'
-        self._config['database.dir'] = self._data_dir
-        self._config['database.log'] = self._data_dir
-        self._config['authentication_provider'] = 'org.xtreemfs.common.auth.NullAuthProvider'
+        _mkdir_p(self._data_dir)
+
+        self._config.update(self._STATIC_DEFAULTS)
+        self._config.update({
+            'babudb.debug.level': self._config['debug.level'],
+            'babudb.logDir': self._data_dir,
+            'babudb.baseDir': self._data_dir,
+            'database.dir': self._data_dir,
+            'database.log': self._data_dir})
 
 
 class MRC(Server):
+    _MAIN_CLASS = "org.xtreemfs.mrc.MRC"
+
+    # Configuration values which are the same for all MRC instances.
+    _STATIC_DEFAULTS = {
+        'osd_check_interval': 300,
+        'no_atime': 'true',
+        'no_fsync': 'true',
+        'local_clock_renewal': 0,
+        'remote_time_sync': 60000,
+        'capability_secret': 'testsecret',
+        'database.checkpoint.interval': 1800000,
+        'database.checkpoint.idle_interval': 1000,
+        'database.checkpoint.logfile_size': 16384,
+
+        'babudb.sync': 'ASYNC',
+        'babudb.worker.maxQueueLength': '250',
+        'babudb.worker.numThreads': '0',
+        'babudb.maxLogfileSize': '16777216',
+        'babudb.checkInterval': '300',
+        'babudb.pseudoSyncWait': '0',
+        'authentication_provider': 'org.xtreemfs.common.auth.NullAuthProvider'}
+
     def configure(self,
                   dir_host,
                   dir_port):
-        try: os.mkdir(self._data_dir)
-        except: pass
-
-        self._config['dir_service.host'] = dir_host
-        self._config['dir_service.port'] = dir_port
-
-        self._config['osd_check_interval'] = 300
-        self._config['no_atime'] = 'true'
-        self._config['no_fsync'] = 'true'
-        self._config['local_clock_renewal'] = 0
-        self._config['remote_time_sync'] = 60000
-        self._config['capability_secret'] = 'testsecret'
-        self._config['database.checkpoint.interval'] = 1800000
-        self._config['database.checkpoint.idle_interval'] = 1000
-        self._config['database.checkpoint.logfile_size'] = 16384
-
-        self._config['babudb.debug.level'] = self._config['debug.level']
-        self._config['babudb.logDir'] = self._data_dir
-        self._config['babudb.baseDir'] = self._data_dir
-        self._config['babudb.sync'] = 'ASYNC'
-        self._config['babudb.worker.maxQueueLength'] = '250'
-        self._config['babudb.worker.numThreads'] = '0'
-        self._config['babudb.maxLogfileSize'] = '16777216'
-        self._config['babudb.checkInterval'] = '300'
-        self._config['babudb.pseudoSyncWait'] = '0'
-        self._config['database.dir'] = self._data_dir
-        self._config['database.log'] = self._data_dir
-        self._config['authentication_provider'] = 'org.xtreemfs.common.auth.NullAuthProvider'
+        _mkdir_p(self._data_dir)
+
+        self._config.update(self._STATIC_DEFAULTS)
+        self._config.update({
+            'dir_service.host': dir_host,
+            'dir_service.port': dir_port,
+            'babudb.debug.level': self._config['debug.level'],
+            'babudb.logDir': self._data_dir,
+            'babudb.baseDir': self._data_dir,
+            'database.dir': self._data_dir,
+            'database.log': self._data_dir})
 
 
 class OSD(Server):
-    def configure(self,
-                  dir_host,
-                  dir_port):
-        try: os.mkdir(self._data_dir)
-        except: pass
+    _MAIN_CLASS = "org.xtreemfs.osd.OSD"
 
-        self._config['dir_service.host'] = dir_host
-        self._config['dir_service.port'] = dir_port
+    # Configuration values which are the same for all OSD instances.
+    _STATIC_DEFAULTS = {
+        'local_clock_renewal': 0,
+        'remote_time_sync': 60000,
+        'capability_secret': 'testsecret',
+        'report_free_space': 'true',
+        'checksums.enabled': 'false',
 
-        self._config['local_clock_renewal'] = 0
-        self._config['remote_time_sync'] = 60000
-        self._config['capability_secret'] = 'testsecret'
-        self._config['report_free_space'] = 'true'
-        self._config['checksums.enabled'] = 'false'
+        # Some tests overload the test system, increase timeouts.
+        'flease.lease_timeout_ms': 60000,
+        'flease.message_to_ms': 2000}
 
-        self._config['object_dir'] = self._data_dir
+    def configure(self,
+                  dir_host,
+                  dir_port):
+        _mkdir_p(self._data_dir)
 
-        # Some tests overload the test system, increase timeouts.
-        self._config['flease.lease_timeout_ms'] = 60000
-        self._config['flease.message_to_ms'] = 2000
+        self._config.update(self._STATIC_DEFAULTS)
+        self._config.update({
+            'dir_service.host': dir_host,
+            'dir_service.port': dir_port,
+            'object_dir': self._data_dir})